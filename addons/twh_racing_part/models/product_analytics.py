@@ -434,155 +434,3 @@ class TwhAnalyticsResult(models.TransientModel):
                 record.avg_price = record.total_value / record.total_quantity
             else:
                 record.avg_price = 0.0
-
-
-class TwhDashboard(models.Model):
-    """
-    Model untuk dashboard metrics.
-    
-    Model ini menyediakan data summary untuk widget dashboard.
-    """
-    _name = 'twh.dashboard'
-    _description = 'Dashboard Metrics TWH'
-    
-    # ========================
-    # METHODS
-    # ========================
-    
-    @api.model
-    def get_dashboard_data(self, period='this_month'):
-        """
-        Ambil data dashboard untuk widget.
-        
-        Args:
-            period (str): Periode data ('this_month', 'last_3_months', dll)
-        
-        Returns:
-            dict: Dictionary berisi metrics dashboard
-        """
-        today = fields.Date.today()
-        
-        # Tentukan range tanggal
-        date_from, date_to = self._get_date_range(period, today)
-        
-        # Query invoice
-        invoices = self._get_invoices(date_from, date_to)
-        
-        # Hitung metrics
-        metrics = self._calculate_metrics(invoices)
-        
-        # Ambil top products
-        top_products = self._get_top_products(invoices)
-        
-        return {
-            **metrics,
-            'top_products_by_qty': top_products,
-            'period': period,
-            'date_from': date_from,
-            'date_to': date_to,
-        }
-    
-    def _get_date_range(self, period, today):
-        """
-        Tentukan range tanggal berdasarkan periode.
-        
-        Args:
-            period (str): Tipe periode
-            today (date): Tanggal hari ini
-        
-        Returns:
-            tuple: (date_from, date_to)
-        """
-        if period == 'this_month':
-            date_from = today.replace(day=1)
-            date_to = today
-        elif period == 'last_3_months':
-            date_from = today - relativedelta(months=3)
-            date_to = today
-        elif period == 'last_6_months':
-            date_from = today - relativedelta(months=6)
-            date_to = today
-        elif period == 'this_year':
-            date_from = today.replace(month=1, day=1)
-            date_to = today
-        else:
-            date_from = today.replace(month=1, day=1)
-            date_to = today
-        
-        return date_from, date_to
-    
-    def _get_invoices(self, date_from, date_to):
-        """
-        Query invoice dalam periode tertentu.
-        
-        Args:
-            date_from (date): Tanggal mulai
-            date_to (date): Tanggal akhir
-        
-        Returns:
-            recordset: Invoice yang memenuhi kriteria
-        """
-        return self.env['twh.invoice'].search([
-            ('date_invoice', '>=', date_from),
-            ('date_invoice', '<=', date_to),
-            ('state', 'in', ['confirmed', 'paid', 'partial', 'overdue']),
-        ])
-    
-    def _calculate_metrics(self, invoices):
-        """
-        Hitung metrics dari invoice.
-        
-        Args:
-            invoices: Recordset invoice
-        
-        Returns:
-            dict: Dictionary berisi metrics
-        """
-        total_sales = sum(invoices.mapped('total'))
-        total_invoices = len(invoices)
-        total_commission = sum(invoices.mapped('total_commission'))
-        
-        avg_invoice_value = total_sales / total_invoices if total_invoices > 0 else 0
-        
-        return {
-            'total_sales': total_sales,
-            'total_invoices': total_invoices,
-            'total_commission': total_commission,
-            'avg_invoice_value': avg_invoice_value,
-        }
-    
-    def _get_top_products(self, invoices):
-        """
-        Ambil top 10 produk terlaris.
-        
-        Args:
-            invoices: Recordset invoice
-        
-        Returns:
-            list: List of dict top products
-        """
-        invoice_lines = invoices.mapped('invoice_line_ids')
-        product_sales = {}
-        
-        # Group per produk
-        for line in invoice_lines:
-            product_id = line.product_id.id
-            
-            if product_id not in product_sales:
-                product_sales[product_id] = {
-                    'product': line.product_id,
-                    'quantity': 0,
-                    'value': 0,
-                }
-            
-            product_sales[product_id]['quantity'] += line.quantity
-            product_sales[product_id]['value'] += line.subtotal
-        
-        # Sort berdasarkan quantity dan ambil top 10
-        top_products = sorted(
-            product_sales.values(),
-            key=lambda x: x['quantity'],
-            reverse=True
-        )[:10]
-        
-        return top_products
\ No newline at end of file
@@ -1,11 +1,14 @@
 # -*- coding: utf-8 -*-
 
 import calendar
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 
-from odoo import api, fields, models, _
+from odoo import api, fields, models, tools, _
 from odoo.exceptions import UserError
 
+# Domain dasar ringkasan komisi (hanya komisi yang sudah berlaku)
+_BASE_SUMMARY_DOMAIN = (('state', 'in', ('confirmed', 'paid')),)
+
 
 class TwhSalesCommission(models.Model):
     """
@@ -31,10 +34,10 @@ class TwhSalesCommission(models.Model):
         help='Invoice yang menghasilkan komisi ini'
     )
     
+    # Tidak di-store: cukup dibaca dari invoice (tetap bisa dicari via related)
     invoice_name = fields.Char(
         related='invoice_id.name',
-        string='Nomor Invoice',
-        store=True
+        string='Nomor Invoice'
     )
     
     sales_person_id = fields.Many2one(
@@ -128,6 +131,23 @@ class TwhSalesCommission(models.Model):
         default=lambda self: self.env.company
     )
     
+    # ========================
+    # INIT METHOD (Index)
+    # ========================
+    
+    def init(self):
+        """
+        Buat index komposit (invoice_id, commission_amount).
+        
+        Total komisi invoice dijumlahkan per invoice_id, jadi index ini
+        bisa dipakai untuk index-only scan; sekaligus dipakai untuk baca
+        commission_ids per invoice.
+        """
+        tools.create_index(
+            self.env.cr, 'twh_sales_commission_invoice_amount_idx',
+            self._table, ['invoice_id', 'commission_amount']
+        )
+    
     # ========================
     # BUSINESS METHODS
     # ========================
@@ -152,7 +172,72 @@ class TwhSalesCommission(models.Model):
                 }
         """
         # Build domain filter
-        domain = [('state', 'in', ['confirmed', 'paid'])]
+        domain = self._get_summary_domain(sales_person_id, date_from, date_to)
+        
+        # Query komisi (dipakai report untuk baris detail)
+        commissions = self.search(domain)
+        
+        # Hitung summary langsung di database
+        totals = self.get_commission_totals(domain)
+        summary = {
+            'total_commission': totals['total_commission'],
+            'total_quantity': totals['total_quantity'],
+            'total_invoices': totals['total_invoices'],
+            'commissions': commissions,
+        }
+        
+        return summary
+    
+    @api.model
+    def get_commission_totals(self, domain):
+        """
+        Ambil total komisi langsung dari database (tanpa load recordset).
+        
+        Dipakai oleh caller yang hanya butuh angka total, misalnya kartu
+        summary di laporan komisi (lewat get_commission_summary).
+        
+        Args:
+            domain (list): Domain filter komisi
+        
+        Returns:
+            dict: Total komisi dengan struktur:
+                {
+                    'total_commission': float,
+                    'total_quantity': float,
+                    'total_invoices': int,
+                    'count': int
+                }
+        """
+        [(total_commission, total_quantity, total_invoices, count)] = self._read_group(
+            domain,
+            aggregates=[
+                'commission_amount:sum',
+                'quantity:sum',
+                'invoice_id:count_distinct',
+                '__count',
+            ],
+        )
+        
+        return {
+            'total_commission': total_commission or 0.0,
+            'total_quantity': total_quantity or 0.0,
+            'total_invoices': total_invoices,
+            'count': count,
+        }
+    
+    def _get_summary_domain(self, sales_person_id=None, date_from=None, date_to=None):
+        """
+        Susun domain filter untuk ringkasan komisi.
+        
+        Args:
+            sales_person_id (int, optional): Filter by sales person
+            date_from (date, optional): Tanggal mulai
+            date_to (date, optional): Tanggal akhir
+        
+        Returns:
+            list: Domain filter
+        """
+        domain = list(_BASE_SUMMARY_DOMAIN)
         
         if sales_person_id:
             domain.append(('sales_person_id', '=', sales_person_id))
@@ -163,18 +248,7 @@ class TwhSalesCommission(models.Model):
         if date_to:
             domain.append(('date', '<=', date_to))
         
-        # Query komisi
-        commissions = self.search(domain)
-        
-        # Hitung summary
-        summary = {
-            'total_commission': sum(commissions.mapped('commission_amount')),
-            'total_quantity': sum(commissions.mapped('quantity')),
-            'total_invoices': len(commissions.mapped('invoice_id')),
-            'commissions': commissions,
-        }
-        
-        return summary
+        return domain
     
     @api.model
     def get_monthly_commission(self, sales_person_id, year, month):
@@ -190,11 +264,11 @@ class TwhSalesCommission(models.Model):
             dict: Ringkasan komisi bulan tersebut
         """
         # Tanggal awal bulan
-        date_from = fields.Date.from_string(f'{year}-{month:02d}-01')
+        date_from = date(year, month, 1)
         
         # Tanggal akhir bulan (ambil hari terakhir)
         last_day = calendar.monthrange(year, month)[1]
-        date_to = fields.Date.from_string(f'{year}-{month:02d}-{last_day}')
+        date_to = date(year, month, last_day)
         
         return self.get_commission_summary(sales_person_id, date_from, date_to)
     
@@ -328,12 +402,4 @@ class TwhCommissionReportWizard(models.TransientModel):
         
         TODO: Implementasi export Excel akan dikembangkan nanti.
         """
-        commission_model = self.env['twh.sales.commission']
-        
-        summary = commission_model.get_commission_summary(
-            self.sales_person_id.id if self.sales_person_id else None,
-            self.date_from,
-            self.date_to
-        )
-        
         raise UserError(_('Fitur export Excel akan dikembangkan dalam versi selanjutnya'))
\ No newline at end of file
@@ -1,19 +1,50 @@
 # -*- coding: utf-8 -*-
 
-from odoo import api, fields, models
-from datetime import datetime
-from dateutil.relativedelta import relativedelta
+from odoo import api, fields, models, tools
+from datetime import date, timedelta
+import copy
 import logging
+import time
 
 _logger = logging.getLogger(__name__)
 
+# Ganti pemisah ribuan ',' jadi '.' (format rupiah) dalam satu pass
+_RP_TRANS = str.maketrans({',': '.'})
 
-class TwhDashboard(models.TransientModel):
+# Umur maksimal cache data dashboard (detik). Cache tidak dibersihkan
+# saat invoice/pembayaran berubah, jadi data paling lama tertinggal
+# selama TTL ini.
+_SUMMARY_CACHE_TTL = 60
+
+# Bagian summary dashboard yang bisa diminta terpisah oleh frontend
+_SUMMARY_SECTIONS = ('counters', 'unpaid', 'revenue', 'sales')
+
+
+def _month_start(day, months_back):
+    """
+    Tanggal 1 dari bulan yang mundur N bulan dari tanggal acuan.
+    
+    Pakai aritmatika indeks bulan (tahun * 12 + bulan), lebih ringan
+    dari relativedelta untuk dipanggil di dalam loop.
+    
+    Args:
+        day (date): Tanggal acuan
+        months_back (int): Jumlah bulan mundur (negatif = maju)
+    
+    Returns:
+        date: Tanggal 1 bulan target
+    """
+    index = day.year * 12 + day.month - 1 - months_back
+    return date(index // 12, index % 12 + 1, 1)
+
+
+class TwhDashboard(models.AbstractModel):
     """
     Model untuk menyediakan data dashboard TWH Racing Part.
     
-    Model ini adalah transient (tidak menyimpan data ke database),
-    hanya untuk provide data ke frontend dashboard.
+    Model ini adalah abstract (tidak punya tabel di database dan
+    tidak ikut vacuum transient), hanya untuk provide data ke
+    frontend dashboard.
     
     Data yang disediakan:
     1. Sales data (invoice yang dibuat per bulan)
@@ -47,102 +78,126 @@ class TwhDashboard(models.TransientModel):
                 ]
         """
         try:
-            today = datetime.now()
-            sales_data = []
-            
-            # Loop dari bulan terlama ke terbaru
-            for i in range(months):
-                # Hitung target bulan
-                target_date = today - relativedelta(months=months - i - 1)
-                
-                # Tentukan range tanggal untuk bulan ini
-                date_range = self._get_month_date_range(target_date, today)
-                
-                # Query invoice untuk bulan ini
-                invoices = self._query_invoices_by_date_range(
-                    date_range['start'],
-                    date_range['end']
-                )
-                
-                # Hitung total sales
-                total_amount = sum(invoices.mapped('total'))
-                
-                # Format label bulan
-                month_label = target_date.strftime('%b %Y')
-                
-                sales_data.append({
-                    'month': month_label,
-                    'amount': round(total_amount, 2)
-                })
-                
-                # Log untuk debugging
-                _logger.info(
-                    f'Sales {month_label}: {len(invoices)} invoice, '
-                    f'Total: Rp {total_amount:,.0f}'
-                )
-            
-            _logger.info(f'Sales data berhasil dimuat: {len(sales_data)} bulan')
-            return sales_data
+            today = fields.Date.context_today(self)
+            return [
+                {'month': month_label, 'amount': amount}
+                for month_label, amount in self._compute_sales_data(months, today)
+            ]
             
         except Exception as error:
-            _logger.error(f'Error saat load sales data: {str(error)}')
+            _logger.error('Error saat load sales data: %s', error)
             return []
 
-    def _get_month_date_range(self, target_date, today):
+    @tools.ormcache(
+        'self.env.uid', 'tuple(self.env.companies.ids)', 'months', 'today',
+        'self._cache_bucket()'
+    )
+    def _compute_sales_data(self, months, today):
         """
-        Tentukan range tanggal untuk satu bulan.
+        Hitung data penjualan N bulan terakhir (hasil di-cache).
+        
+        Dipanggil oleh dashboard summary dan endpoint chart, sehingga
+        query tidak diulang selama slot waktu cache yang sama.
         
         Args:
-            target_date (datetime): Target bulan
-            today (datetime): Tanggal hari ini
+            months (int): Jumlah bulan data yang diambil
+            today (date): Tanggal hari ini, bagian dari key cache
         
         Returns:
-            dict: {'start': date, 'end': date}
+            tuple: Tuple of (month_label, amount), tidak bisa diubah
+                karena nilai ini disimpan di cache
         """
-        # Awal bulan
-        month_start = target_date.replace(
-            day=1, 
-            hour=0, 
-            minute=0, 
-            second=0, 
-            microsecond=0
+        sales_data = []
+        
+        # Satu query agregasi untuk seluruh rentang N bulan
+        month_starts = [
+            _month_start(today, months - i - 1) for i in range(months)
+        ]
+        monthly_totals = self._get_monthly_invoice_totals(
+            month_starts[0], today + timedelta(days=1)
         )
         
-        # Akhir bulan (hari ini jika bulan ini, atau akhir bulan jika bulan lalu)
-        if target_date.month == today.month and target_date.year == today.year:
-            # Bulan ini: sampai hari ini
-            month_end = today.replace(
-                hour=23, 
-                minute=59, 
-                second=59, 
-                microsecond=999999
-            )
-        else:
-            # Bulan lalu: sampai akhir bulan
-            next_month = month_start + relativedelta(months=1)
-            month_end = next_month - relativedelta(seconds=1)
+        # Loop dari bulan terlama ke terbaru, isi 0 untuk bulan kosong
+        invoice_total = 0
+        for month_start in month_starts:
+            total_amount, invoice_count = monthly_totals.get(month_start, (0.0, 0))
+            
+            # Format label bulan
+            month_label = month_start.strftime('%b %Y')
+            
+            sales_data.append((month_label, round(total_amount, 2)))
+            invoice_total += invoice_count
+        
+        _logger.info(
+            'Sales data berhasil dimuat: %d bulan, %d invoice',
+            len(sales_data), invoice_total
+        )
+        return tuple(sales_data)
+
+    @api.model
+    def get_sales_data_chunk(self, offset=0, length=1):
+        """
+        Ambil data penjualan per potongan bulan (untuk range panjang).
+        
+        Frontend mulai dari bulan terbaru (offset=0, length=1), lalu
+        memanggil lagi dengan next_offset/next_length sampai cukup.
+        Panjang potongan berlipat dua tiap panggilan, maksimal 12 bulan.
+        
+        Args:
+            offset (int): Jumlah bulan yang dilewati dari bulan ini ke belakang
+            length (int): Jumlah bulan dalam potongan ini
+        
+        Returns:
+            dict: {
+                'data': list of dict {'month': str, 'amount': float}
+                        (urut dari bulan terlama ke terbaru),
+                'next_offset': int,
+                'next_length': int
+            }
+        """
+        offset = max(int(offset), 0)
+        length = min(max(int(length), 1), 12)
+        today = fields.Date.context_today(self)
+        
+        # Ambil N bulan terakhir (offset + length) lewat cache yang sama
+        # dengan get_sales_data, lalu potong bagian terlama sepanjang length
+        sales_data = self._compute_sales_data(offset + length, today)
+        data = [
+            {'month': month_label, 'amount': amount}
+            for month_label, amount in sales_data[:length]
+        ]
         
         return {
-            'start': fields.Date.to_string(month_start.date()),
-            'end': fields.Date.to_string(month_end.date())
+            'data': data,
+            'next_offset': offset + length,
+            'next_length': min(length * 2, 12),
         }
 
-    def _query_invoices_by_date_range(self, date_from, date_to):
+    def _get_monthly_invoice_totals(self, date_from, date_to):
         """
-        Query invoice berdasarkan range tanggal.
+        Agregasi total invoice per bulan langsung di database.
         
         Args:
-            date_from (str): Tanggal mulai (format: YYYY-MM-DD)
-            date_to (str): Tanggal akhir (format: YYYY-MM-DD)
+            date_from (date): Tanggal mulai (awal bulan terlama, inklusif)
+            date_to (date): Tanggal akhir (besok, eksklusif)
         
         Returns:
-            recordset: Invoice yang memenuhi kriteria
+            dict: {awal_bulan (date): (total (float), jumlah invoice (int))}
         """
-        return self.env['twh.invoice'].search([
-            ('date_invoice', '>=', date_from),
-            ('date_invoice', '<=', date_to),
-            ('state', 'in', ['confirmed', 'partial', 'paid', 'overdue'])
-        ])
+        rows = self.env['twh.invoice']._read_group(
+            [
+                ('date_invoice', '>=', date_from),
+                ('date_invoice', '<', date_to),
+                ('state', 'in', ['confirmed', 'partial', 'paid', 'overdue'])
+            ],
+            groupby=['date_invoice:month'],
+            aggregates=['total:sum', '__count'],
+        )
+        
+        return {
+            month_start: (total or 0.0, count)
+            for month_start, total, count in rows
+        }
 
     # ========================
     # REVENUE DATA METHODS
@@ -171,39 +226,11 @@ class TwhDashboard(models.TransientModel):
                 }
         """
         try:
-            today = datetime.now()
-            
-            # Tentukan domain filter berdasarkan periode
-            domain = [('state', '=', 'confirmed')]
-            period_label = self._add_period_filter(domain, period, today)
-            
-            # Query payments yang sudah confirmed
-            payments = self.env['twh.payment'].search(domain)
-            
-            # Hitung metrics
-            total_amount = sum(payments.mapped('amount'))
-            payment_count = len(payments)
-            invoice_count = len(payments.mapped('invoice_id'))
-            
-            # Format currency
-            formatted_amount = self._format_currency(total_amount)
-            
-            _logger.info(
-                f'Revenue ({period}): {formatted_amount} '
-                f'dari {payment_count} pembayaran, {invoice_count} invoice'
-            )
-            
-            return {
-                'amount': total_amount,
-                'formatted': formatted_amount,
-                'period_label': period_label,
-                'payment_count': payment_count,
-                'invoice_count': invoice_count,
-                'period': period
-            }
+            today = fields.Date.context_today(self)
+            return dict(self._compute_total_revenue(period, today))
             
         except Exception as error:
-            _logger.error(f'Error saat hitung revenue: {str(error)}')
+            _logger.error('Error saat hitung revenue: %s', error)
             return {
                 'amount': 0,
                 'formatted': 'Rp 0',
@@ -213,6 +240,49 @@ class TwhDashboard(models.TransientModel):
                 'period': period
             }
 
+    @tools.ormcache(
+        'self.env.uid', 'tuple(self.env.companies.ids)', 'period', 'today',
+        'self._cache_bucket()'
+    )
+    def _compute_total_revenue(self, period, today):
+        """
+        Hitung total revenue untuk periode tertentu (hasil di-cache).
+        
+        Args:
+            period (str): Periode revenue ('month', 'year', 'all')
+            today (date): Tanggal hari ini, bagian dari key cache
+        
+        Returns:
+            dict: Struktur sama dengan get_total_revenue
+        """
+        # Tentukan domain filter berdasarkan periode
+        domain = [('state', '=', 'confirmed')]
+        period_label = self._add_period_filter(domain, period, today)
+        
+        # Agregasi payment confirmed langsung di database
+        [(total_amount, payment_count, invoice_count)] = self.env['twh.payment']._read_group(
+            domain,
+            aggregates=['amount:sum', '__count', 'invoice_id:count_distinct'],
+        )
+        total_amount = total_amount or 0.0
+        
+        # Format currency
+        formatted_amount = self._format_currency(total_amount)
+        
+        _logger.info(
+            'Revenue (%s): %s dari %d pembayaran, %d invoice',
+            period, formatted_amount, payment_count, invoice_count
+        )
+        
+        return {
+            'amount': total_amount,
+            'formatted': formatted_amount,
+            'period_label': period_label,
+            'payment_count': payment_count,
+            'invoice_count': invoice_count,
+            'period': period
+        }
+
     def _add_period_filter(self, domain, period, today):
         """
         Tambahkan filter periode ke domain dan return label periode.
@@ -220,23 +290,26 @@ class TwhDashboard(models.TransientModel):
         Args:
             domain (list): Domain list yang akan dimodifikasi
             period (str): Tipe periode
-            today (datetime): Tanggal hari ini
+            today (date): Tanggal hari ini
         
         Returns:
             str: Label periode untuk display
         """
+        # Range setengah terbuka [awal periode, besok) agar domain sama sepanjang hari
+        tomorrow = today + timedelta(days=1)
+        
         if period == 'month':
             # Bulan ini
             month_start = today.replace(day=1)
-            domain.append(('payment_date', '>=', fields.Date.to_string(month_start)))
-            domain.append(('payment_date', '<=', fields.Date.to_string(today)))
+            domain.append(('payment_date', '>=', month_start))
+            domain.append(('payment_date', '<', tomorrow))
             return f"{today.strftime('%B %Y')}"
             
         elif period == 'year':
             # Tahun ini
             year_start = today.replace(month=1, day=1)
-            domain.append(('payment_date', '>=', fields.Date.to_string(year_start)))
-            domain.append(('payment_date', '<=', fields.Date.to_string(today)))
+            domain.append(('payment_date', '>=', year_start))
+            domain.append(('payment_date', '<', tomorrow))
             return f"Tahun {today.year}"
             
         else:  # 'all'
@@ -253,14 +326,14 @@ class TwhDashboard(models.TransientModel):
         Returns:
             str: Format rupiah (contoh: "Rp 1.500.000")
         """
-        return 'Rp {:,.0f}'.format(amount).replace(',', '.')
+        return 'Rp ' + format(amount, ',.0f').translate(_RP_TRANS)
 
     # ========================
     # DASHBOARD SUMMARY METHODS
     # ========================
 
     @api.model
-    def get_dashboard_summary(self, revenue_period='month'):
+    def get_dashboard_summary(self, revenue_period='month', sections=None):
         """
         Ambil summary statistics untuk dashboard.
         
@@ -274,46 +347,104 @@ class TwhDashboard(models.TransientModel):
         7. Revenue data (sesuai periode)
         8. Monthly sales data (6 bulan)
         
+        Data dikelompokkan per bagian: 'counters' (1-2), 'unpaid' (3-6),
+        'revenue' (7), dan 'sales' (8). Hanya bagian yang diminta yang
+        dihitung dan dikembalikan.
+        
+        Summary di-cache per user, perusahaan aktif, periode, dan tanggal
+        hari ini, dengan umur maksimal _SUMMARY_CACHE_TTL detik.
+        
         Args:
             revenue_period (str): Periode untuk revenue ('month', 'year', 'all')
+            sections (list): Bagian yang dihitung (default: semua bagian)
         
         Returns:
-            dict: Dictionary berisi semua summary statistics
+            dict: Dictionary berisi summary statistics bagian yang diminta
         """
         try:
+            today_date = fields.Date.context_today(self)
+            sections = tuple(
+                section for section in _SUMMARY_SECTIONS
+                if not sections or section in sections
+            )
+            # Deep copy: monthly_sales di dalam summary ikut tersimpan di cache
+            return copy.deepcopy(self._compute_dashboard_summary(
+                revenue_period, today_date, sections
+            ))
+            
+        except Exception as error:
+            _logger.error('Error saat ambil dashboard summary: %s', error)
+            return self._get_empty_summary()
+
+    @tools.ormcache(
+        'self.env.uid', 'tuple(self.env.companies.ids)', 'revenue_period',
+        'today_date', 'sections', 'self._cache_bucket()'
+    )
+    def _compute_dashboard_summary(self, revenue_period, today_date, sections):
+        """
+        Hitung summary statistics dashboard (hasil di-cache).
+        
+        Args:
+            revenue_period (str): Periode untuk revenue ('month', 'year', 'all')
+            today_date (date): Tanggal hari ini, bagian dari key cache
+            sections (tuple): Bagian yang dihitung, bagian dari key cache
+        
+        Returns:
+            dict: Dictionary berisi summary statistics bagian yang diminta
+        """
+        summary = {}
+        
+        if 'counters' in sections:
+            summary['total_products'] = self._count_active_products()
+            summary['total_customers'] = self._count_active_customers()
+        
+        if 'unpaid' in sections:
             # Hitung unpaid invoices dan outstanding
             unpaid_stats = self._calculate_unpaid_stats()
-            
-            # Ambil revenue data dengan periode
-            revenue_data = self.get_total_revenue(revenue_period)
-            
-            # Build summary lengkap
-            summary = {
-                'total_products': self._count_active_products(),
-                'total_customers': self._count_active_customers(),
+            summary.update({
                 'unpaid_invoices': unpaid_stats['count'],
                 'total_outstanding': unpaid_stats['outstanding_formatted'],
                 'overdue_count': unpaid_stats['overdue_count'],
                 'partial_count': unpaid_stats['partial_count'],
+            })
+        
+        if 'revenue' in sections:
+            # Ambil revenue data dengan periode
+            revenue_data = self.get_total_revenue(revenue_period)
+            summary.update({
                 'total_revenue': revenue_data['formatted'],
                 'revenue_period': revenue_data['period'],
                 'revenue_period_label': revenue_data['period_label'],
                 'revenue_payment_count': revenue_data['payment_count'],
                 'revenue_invoice_count': revenue_data['invoice_count'],
-                'monthly_sales': self.get_sales_data()
-            }
-            
-            _logger.info(
-                f'Dashboard summary: {summary["total_products"]} produk, '
-                f'{summary["total_customers"]} customer, '
-                f'{summary["unpaid_invoices"]} unpaid invoice'
-            )
-            
-            return summary
-            
-        except Exception as error:
-            _logger.error(f'Error saat ambil dashboard summary: {str(error)}')
-            return self._get_empty_summary()
+            })
+        
+        if 'sales' in sections:
+            summary['monthly_sales'] = self.get_sales_data()
+        
+        _logger.info(
+            'Dashboard summary (%s): %s produk, %s customer, %s unpaid invoice',
+            ', '.join(sections),
+            summary.get('total_products', '-'),
+            summary.get('total_customers', '-'),
+            summary.get('unpaid_invoices', '-')
+        )
+        
+        return summary
+
+    @api.model
+    def _cache_bucket(self):
+        """
+        Nomor slot waktu untuk key cache dashboard.
+        
+        Berganti setiap _SUMMARY_CACHE_TTL detik, sehingga data dashboard
+        ter-update tanpa perlu membersihkan cache registry saat invoice
+        atau pembayaran berubah.
+        
+        Returns:
+            int: Nomor slot waktu saat ini
+        """
+        return int(time.time() // _SUMMARY_CACHE_TTL)
 
     def _count_active_products(self):
         """
@@ -356,26 +487,31 @@ class TwhDashboard(models.TransientModel):
                     'partial_count': int (jumlah cicilan)
                 }
         """
-        # Query unpaid invoices
-        unpaid_invoices = self.env['twh.invoice'].search([
-            ('payment_type', '=', 'tempo'),
-            ('state', 'in', ['confirmed', 'partial', 'overdue']),
-        ])
+        # Satu query agregasi per (tipe pembayaran, status)
+        rows = self.env['twh.invoice']._read_group(
+            [('state', 'in', ['confirmed', 'partial', 'overdue'])],
+            groupby=['payment_type', 'state'],
+            aggregates=['__count', 'remaining_amount:sum'],
+        )
         
-        # Hitung total outstanding
-        total_outstanding = sum(unpaid_invoices.mapped('remaining_amount'))
+        unpaid_count = 0
+        total_outstanding = 0.0
+        state_counts = {'confirmed': 0, 'partial': 0, 'overdue': 0}
         
-        # Hitung overdue & partial
-        overdue_count = self.env['twh.invoice'].search_count([
-            ('state', '=', 'overdue'),
-        ])
+        for payment_type, state, count, remaining in rows:
+            # Overdue & partial dihitung untuk semua tipe pembayaran
+            state_counts[state] += count
+            
+            # Unpaid & outstanding hanya untuk invoice tempo
+            if payment_type == 'tempo':
+                unpaid_count += count
+                total_outstanding += remaining or 0.0
         
-        partial_count = self.env['twh.invoice'].search_count([
-            ('state', '=', 'partial'),
-        ])
+        overdue_count = state_counts['overdue']
+        partial_count = state_counts['partial']
         
         return {
-            'count': len(unpaid_invoices),
+            'count': unpaid_count,
             'outstanding': total_outstanding,
             'outstanding_formatted': self._format_currency(total_outstanding),
             'overdue_count': overdue_count,
@@ -2,9 +2,12 @@
 
 from datetime import timedelta 
 
-from odoo import api, fields, models, _
+from odoo import api, fields, models, tools, _
 from odoo.exceptions import UserError, ValidationError
 
+# Status invoice yang masih bisa menerima pembayaran
+_PAYABLE_STATES = frozenset({'confirmed', 'partial', 'overdue'})
+
 
 class TwhInvoice(models.Model):
     """
@@ -37,6 +40,7 @@ class TwhInvoice(models.Model):
         string='Customer', 
         required=True, 
         tracking=True,
+        index=True,
         domain=[('is_company', '=', True)],
         help='Pilih toko atau dealer yang membeli'
     )
@@ -80,6 +84,7 @@ class TwhInvoice(models.Model):
         'twh.invoice.line', 
         'invoice_id', 
         string='Detail Produk',
+        auto_join=True,
         help='Daftar produk yang dibeli'
     )
     
@@ -133,6 +138,7 @@ class TwhInvoice(models.Model):
         'twh.payment',
         'invoice_id',
         string='Riwayat Pembayaran',
+        auto_join=True,
         help='Daftar pembayaran yang sudah diterima'
     )
     
@@ -161,7 +167,8 @@ class TwhInvoice(models.Model):
     
     payment_count = fields.Integer(
         string='Jumlah Pembayaran',
-        compute='_compute_payment_count',
+        compute='_compute_payment_status',
+        store=True,
         help='Total berapa kali customer sudah bayar'
     )
     
@@ -221,19 +228,60 @@ class TwhInvoice(models.Model):
         default=lambda self: self.env.company
     )
     
+    # ========================
+    # INIT METHOD (Index)
+    # ========================
+    
+    def init(self):
+        """
+        Buat index untuk urutan list view dan query sales dashboard.
+        
+        1. Index (date_invoice DESC, id DESC) sama dengan _order, jadi list
+           view yang di-paginate bisa dibaca langsung dari index tanpa sort.
+        2. Partial index date_invoice untuk query sales dashboard, yang
+           selalu memfilter range tanggal dengan status penjualan (bukan
+           draft/cancel), jadi lebih kecil dari index komposit
+           (date_invoice, state).
+        3. Partial index date_due untuk invoice yang belum lunas
+           (piutang terbuka), dipakai filter jatuh tempo, reminder, dan
+           statistik unpaid dashboard.
+        """
+        tools.create_index(
+            self.env.cr, 'twh_invoice_order_idx',
+            self._table, ['date_invoice DESC', 'id DESC']
+        )
+        tools.create_index(
+            self.env.cr, 'twh_invoice_sales_date_idx',
+            self._table, ['date_invoice'],
+            where="state IN ('confirmed', 'partial', 'paid', 'overdue')"
+        )
+        tools.create_index(
+            self.env.cr, 'twh_invoice_open_due_idx',
+            self._table, ['date_due'],
+            where="state IN ('confirmed', 'partial', 'overdue')"
+        )
+    
     # ========================
     # COMPUTED METHODS
     # ========================
     
-    @api.depends('invoice_line_ids', 'invoice_line_ids.subtotal', 'discount_percent')
+    @api.depends('invoice_line_ids.subtotal', 'discount_percent')
     def _compute_amounts(self):
         """
         Menghitung subtotal, diskon, dan total invoice.
         Dijalankan otomatis saat ada perubahan di line items atau diskon.
+        
+        Subtotal invoice yang sudah tersimpan dijumlahkan dengan satu query
+        SUM GROUP BY; invoice baru (belum ada di database) dihitung di memory.
         """
+        subtotals = self._fetch_aggregates('twh.invoice.line', ['subtotal:sum'])
+        
         for invoice in self:
             # Hitung subtotal dari semua line
-            subtotal = sum(line.subtotal for line in invoice.invoice_line_ids)
+            if invoice.id:
+                subtotal = subtotals.get(invoice.id, (0.0,))[0]
+            else:
+                subtotal = sum(invoice.invoice_line_ids.mapped('subtotal'))
             
             # Hitung nilai diskon
             discount_amount = subtotal * (invoice.discount_percent / 100.0)
@@ -241,28 +289,38 @@ class TwhInvoice(models.Model):
             # Hitung total setelah diskon
             total = subtotal - discount_amount
             
-            invoice.update({
-                'subtotal': subtotal,
-                'discount_amount': discount_amount,
-                'total': total,
-            })
+            invoice.subtotal = subtotal
+            invoice.discount_amount = discount_amount
+            invoice.total = total
     
-    @api.depends('payment_ids', 'payment_ids.amount', 'payment_ids.state', 'total')
+    @api.depends('payment_ids.amount', 'payment_ids.state', 'total')
     def _compute_payment_status(self):
         """
         Menghitung status pembayaran invoice.
         
-        Menghitung berapa yang sudah dibayar, sisa tagihan, dan progress pembayaran.
-        Juga otomatis update status invoice jika sudah lunas atau dibayar sebagian.
+        Menghitung berapa yang sudah dibayar, jumlah pembayaran, sisa tagihan,
+        dan progress pembayaran. Status invoice tidak diubah di sini, lihat
+        _update_state_from_payments().
+        
+        Pembayaran confirmed untuk invoice yang sudah tersimpan dijumlahkan
+        dengan satu query SUM/COUNT GROUP BY; invoice baru (belum ada di
+        database) dihitung di memory.
         """
+        payment_totals = self._fetch_aggregates(
+            'twh.payment', ['amount:sum', '__count'], [('state', '=', 'confirmed')]
+        )
+        
         for invoice in self:
-            # Filter hanya pembayaran yang sudah dikonfirmasi
-            confirmed_payments = invoice.payment_ids.filtered(
-                lambda payment: payment.state == 'confirmed'
-            )
-            
-            # Hitung total yang sudah dibayar
-            paid_amount = sum(confirmed_payments.mapped('amount'))
+            # Hitung total & jumlah pembayaran yang sudah dikonfirmasi
+            if invoice.id:
+                paid_amount, payment_count = payment_totals.get(invoice.id, (0.0, 0))
+            else:
+                paid_amount = 0.0
+                payment_count = 0
+                for payment in invoice.payment_ids:
+                    if payment.state == 'confirmed':
+                        paid_amount += payment.amount
+                        payment_count += 1
             
             # Hitung sisa tagihan
             remaining_amount = invoice.total - paid_amount
@@ -274,29 +332,10 @@ class TwhInvoice(models.Model):
                 progress = 0.0
             
             # Update field
-            invoice.update({
-                'paid_amount': paid_amount,
-                'remaining_amount': remaining_amount,
-                'payment_progress': progress,
-            })
-            
-            # Auto-update status berdasarkan pembayaran
-            # Hanya update jika invoice dalam status tertentu
-            if invoice.state in ['confirmed', 'partial', 'overdue']:
-                if remaining_amount <= 0:
-                    # Sudah lunas
-                    invoice.state = 'paid'
-                elif paid_amount > 0:
-                    # Sudah ada pembayaran tapi belum lunas
-                    invoice.state = 'partial'
-    
-    @api.depends('payment_ids')
-    def _compute_payment_count(self):
-        """Menghitung jumlah pembayaran yang sudah dikonfirmasi."""
-        for invoice in self:
-            invoice.payment_count = len(
-                invoice.payment_ids.filtered(lambda p: p.state == 'confirmed')
-            )
+            invoice.paid_amount = paid_amount
+            invoice.remaining_amount = remaining_amount
+            invoice.payment_progress = progress
+            invoice.payment_count = payment_count
     
     @api.depends('date_invoice', 'payment_term_days', 'payment_type')
     def _compute_due_date(self):
@@ -318,14 +357,52 @@ class TwhInvoice(models.Model):
             else:
                 invoice.date_due = False
     
-    @api.depends('commission_ids', 'commission_ids.commission_amount')
+    @api.depends('commission_ids.commission_amount')
     def _compute_total_commission(self):
-        """Menghitung total komisi dari semua line commission."""
+        """
+        Menghitung total komisi dari semua line commission.
+        
+        Invoice yang sudah tersimpan dijumlahkan dengan satu query SUM
+        GROUP BY; invoice baru (belum ada di database) dihitung di memory.
+        """
+        totals = self._fetch_aggregates(
+            'twh.sales.commission', ['commission_amount:sum']
+        )
+        
         for invoice in self:
-            invoice.total_commission = sum(
-                commission.commission_amount 
-                for commission in invoice.commission_ids
-            )
+            if invoice.id:
+                invoice.total_commission = totals.get(invoice.id, (0.0,))[0]
+            else:
+                invoice.total_commission = sum(
+                    invoice.commission_ids.mapped('commission_amount')
+                )
+    
+    def _fetch_aggregates(self, model_name, aggregates, domain=()):
+        """
+        Agregasi record anak (line, payment, komisi) per invoice.
+        
+        Satu query GROUP BY invoice_id untuk semua invoice tersimpan di
+        recordset; dipakai bersama oleh method compute di atas. Invoice
+        baru (belum ada di database) tidak ikut dan harus dihitung di memory.
+        
+        Args:
+            model_name (str): Model anak yang punya field invoice_id
+            aggregates (list): Spesifikasi agregat _read_group (contoh: ['amount:sum'])
+            domain (list): Filter tambahan untuk record anak
+        
+        Returns:
+            dict: {invoice_id (int): tuple nilai agregat sesuai urutan aggregates}
+        """
+        saved_invoices = self.filtered('id')
+        if not saved_invoices:
+            return {}
+        
+        rows = self.env[model_name]._read_group(
+            [('invoice_id', 'in', saved_invoices.ids), *domain],
+            groupby=['invoice_id'],
+            aggregates=aggregates,
+        )
+        return {invoice.id: tuple(values) for invoice, *values in rows}
     
     # ========================
     # ONCHANGE METHODS
@@ -353,16 +430,48 @@ class TwhInvoice(models.Model):
     # CRUD METHODS
     # ========================
     
-    @api.model
-    def create(self, vals):
+    @api.model_create_multi
+    def create(self, vals_list):
         """
         Override create untuk generate nomor invoice otomatis.
         Format: TWH/INV/YYYY/00001
+        
+        Mendukung pembuatan banyak invoice sekaligus (satu INSERT).
         """
-        if vals.get('name', 'New') == 'New':
-            vals['name'] = self.env['ir.sequence'].next_by_code('twh.invoice') or 'New'
+        sequence_model = self.env['ir.sequence']
+        for vals in vals_list:
+            if vals.get('name', 'New') == 'New':
+                vals['name'] = sequence_model.next_by_code('twh.invoice') or 'New'
         
-        return super(TwhInvoice, self).create(vals)
+        return super(TwhInvoice, self).create(vals_list)
+    
+    # ========================
+    # BUSINESS METHODS (Status Pembayaran)
+    # ========================
+    
+    def _update_state_from_payments(self):
+        """
+        Update status invoice berdasarkan pembayaran yang sudah diterima.
+        
+        Dipanggil dari twh.payment setiap kali pembayaran dibuat,
+        dikonfirmasi, dibatalkan, diubah, atau dihapus. Hanya invoice yang
+        masih bisa dibayar (confirmed/partial/overdue) yang diupdate:
+        - Sisa tagihan <= 0 -> 'paid'
+        - Sudah ada pembayaran tapi belum lunas -> 'partial'
+        """
+        payable_invoices = self.filtered(lambda inv: inv.state in _PAYABLE_STATES)
+        
+        paid_invoices = payable_invoices.filtered(
+            lambda inv: inv.remaining_amount <= 0
+        )
+        partial_invoices = (payable_invoices - paid_invoices).filtered(
+            lambda inv: inv.paid_amount > 0 and inv.state != 'partial'
+        )
+        
+        if paid_invoices:
+            paid_invoices.write({'state': 'paid'})
+        if partial_invoices:
+            partial_invoices.write({'state': 'partial'})
     
     # ========================
     # ACTION METHODS
@@ -377,38 +486,48 @@ class TwhInvoice(models.Model):
         - Komisi sales dibuat otomatis
         - Jika cash, pembayaran full langsung dibuat
         """
+        # Validasi harus ada produk
+        if any(not invoice.invoice_line_ids for invoice in self):
+            raise UserError(_('Tidak bisa konfirmasi invoice tanpa produk!'))
+        
+        # Update status sekaligus, tanpa tracking per invoice
+        # (perubahan status dicatat lewat log chatter di bawah)
+        self.with_context(tracking_disable=True).write({'state': 'confirmed'})
+        
+        payment_vals_list = []
         for invoice in self:
-            # Validasi harus ada produk
-            if not invoice.invoice_line_ids:
-                raise UserError(_('Tidak bisa konfirmasi invoice tanpa produk!'))
-            
-            # Update status
-            invoice.write({'state': 'confirmed'})
-            
             # Buat komisi untuk sales
             invoice._create_commission()
             
             # Jika cash, langsung buat pembayaran full
             if invoice.payment_type == 'cash':
-                self.env['twh.payment'].create({
+                payment_vals_list.append({
                     'invoice_id': invoice.id,
                     'payment_date': invoice.date_invoice,
                     'amount': invoice.total,
                     'payment_method': 'cash',
                     'note': 'Pembayaran cash saat invoice dibuat',
                 })
-            
-            # Kirim notifikasi
-            invoice.message_post(body=_('Invoice telah dikonfirmasi'))
+        
+        # Buat semua pembayaran cash sekaligus
+        if payment_vals_list:
+            self.env['twh.payment'].create(payment_vals_list)
+        
+        # Catat log di chatter semua invoice sekaligus
+        # (catatan internal, tidak dikirim ke follower)
+        self._message_log_batch(
+            bodies=dict.fromkeys(self.ids, _('Invoice telah dikonfirmasi'))
+        )
     
     def action_mark_paid(self):
         """
         Tandai invoice sebagai lunas manual.
         Biasanya digunakan jika pembayaran di luar sistem.
         """
-        for invoice in self:
-            invoice.write({'state': 'paid'})
-            invoice.message_post(body=_('Invoice ditandai lunas'))
+        self.write({'state': 'paid'})
+        self._message_log_batch(
+            bodies=dict.fromkeys(self.ids, _('Invoice ditandai lunas'))
+        )
     
     def action_cancel(self):
         """
@@ -419,25 +538,25 @@ class TwhInvoice(models.Model):
         - Komisi sales dihapus
         - Pembayaran dihapus
         """
-        for invoice in self:
-            invoice.write({'state': 'cancelled'})
-            
-            # Hapus komisi
-            invoice.commission_ids.unlink()
-            
-            # Hapus pembayaran
-            invoice.payment_ids.unlink()
-            
-            invoice.message_post(body=_('Invoice dibatalkan'))
+        self.write({'state': 'cancelled'})
+        
+        # Hapus komisi & pembayaran semua invoice sekaligus
+        self.commission_ids.unlink()
+        self.payment_ids.unlink()
+        
+        self._message_log_batch(
+            bodies=dict.fromkeys(self.ids, _('Invoice dibatalkan'))
+        )
     
     def action_set_to_draft(self):
         """
         Kembalikan invoice ke draft.
         Bisa digunakan untuk edit invoice yang sudah dikonfirmasi.
         """
-        for invoice in self:
-            invoice.write({'state': 'draft'})
-            invoice.message_post(body=_('Invoice dikembalikan ke draft'))
+        self.write({'state': 'draft'})
+        self._message_log_batch(
+            bodies=dict.fromkeys(self.ids, _('Invoice dikembalikan ke draft'))
+        )
     
     def action_add_payment(self):
         """
@@ -446,7 +565,7 @@ class TwhInvoice(models.Model):
         self.ensure_one()
         
         # Validasi invoice harus sudah dikonfirmasi
-        if self.state not in ['confirmed', 'partial', 'overdue']:
+        if self.state not in _PAYABLE_STATES:
             raise UserError(_('Hanya invoice yang sudah dikonfirmasi yang bisa dibayar!'))
         
         # Validasi masih ada sisa tagihan
@@ -526,10 +645,16 @@ class TwhInvoice(models.Model):
         
         commission_model = self.env['twh.sales.commission']
         
+        # Ambil harga bayu (cost) semua produk dalam satu query
+        lines = self.invoice_line_ids
+        cost_map = lines.product_id.get_prices_by_tier('bayu')
+        
+        commission_vals_list = []
+        
         # Loop setiap produk di invoice
-        for line in self.invoice_line_ids:
+        for line in lines:
             # Ambil harga bayu (cost) produk
-            cost_price = line.product_id.get_price_by_tier('bayu')
+            cost_price = cost_map[line.product_id.id]
             
             # Harga jual ke customer
             selling_price = line.price_unit
@@ -542,7 +667,7 @@ class TwhInvoice(models.Model):
             
             # Buat record komisi jika ada untung
             if commission_amount > 0:
-                commission_model.create({
+                commission_vals_list.append({
                     'invoice_id': self.id,
                     'sales_person_id': self.sales_person_id.id,
                     'product_id': line.product_id.id,
@@ -553,6 +678,10 @@ class TwhInvoice(models.Model):
                     'commission_amount': commission_amount,
                     'date': self.date_invoice,
                 })
+        
+        # Simpan semua komisi sekaligus (multi-row INSERT)
+        if commission_vals_list:
+            commission_model.create(commission_vals_list)
 
 
 class TwhInvoiceLine(models.Model):
@@ -628,6 +757,23 @@ class TwhInvoiceLine(models.Model):
         string='Kategori Harga'
     )
     
+    # ========================
+    # INIT METHOD (Index)
+    # ========================
+    
+    def init(self):
+        """
+        Buat index komposit (invoice_id, subtotal).
+        
+        Subtotal invoice dijumlahkan per invoice_id, jadi index ini bisa
+        dipakai untuk index-only scan; sekaligus dipakai untuk baca
+        invoice_line_ids per invoice.
+        """
+        tools.create_index(
+            self.env.cr, 'twh_invoice_line_invoice_subtotal_idx',
+            self._table, ['invoice_id', 'subtotal']
+        )
+    
     # ========================
     # COMPUTED METHODS
     # ========================
@@ -648,14 +794,19 @@ class TwhInvoiceLine(models.Model):
         Isi otomatis deskripsi dan harga saat produk dipilih.
         
         Harga diambil sesuai kategori harga invoice (A/B/Dealer).
+        Kategori harga dibaca dari context form (parent_price_tier) bila
+        ada, supaya tidak perlu baca record invoice induk.
         """
         if self.product_id:
             # Isi deskripsi dari nama produk
             self.description = self.product_id.name
             
             # Isi harga sesuai kategori harga invoice
-            if self.invoice_id.price_tier:
-                tier_code = self.invoice_id.price_tier
+            tier_code = (
+                self.env.context.get('parent_price_tier')
+                or self.invoice_id.price_tier
+            )
+            if tier_code:
                 price = self.product_id.get_price_by_tier(tier_code)
                 
                 if price > 0:
@@ -668,6 +819,5 @@ class TwhInvoiceLine(models.Model):
     @api.constrains('quantity')
     def _check_quantity(self):
         """Validasi jumlah harus lebih dari 0."""
-        for line in self:
-            if line.quantity <= 0:
-                raise ValidationError(_('Jumlah produk harus lebih dari 0!'))
\ No newline at end of file
+        if any(quantity <= 0 for quantity in self.mapped('quantity')):
+            raise ValidationError(_('Jumlah produk harus lebih dari 0!'))
\ No newline at end of file
@@ -1,8 +1,22 @@
 # -*- coding: utf-8 -*-
 
-from odoo import api, fields, models, _
+from collections import defaultdict
+
+from odoo import api, fields, models, tools, _
 from odoo.exceptions import UserError, ValidationError
 
+# Metode pembayaran & label-nya (dipakai di field dan notifikasi)
+_PAYMENT_METHODS = [
+    ('bank_bca', 'Transfer BCA'),
+    ('bank_mandiri', 'Transfer Mandiri'),
+    ('bank_bni', 'Transfer BNI'),
+    ('bank_bri', 'Transfer BRI'),
+    ('cash', 'Tunai'),
+    ('giro', 'Giro'),
+    ('other', 'Lainnya'),
+]
+_PAYMENT_METHOD_LABELS = dict(_PAYMENT_METHODS)
+
 
 class TwhPayment(models.Model):
     """
@@ -26,7 +40,6 @@ class TwhPayment(models.Model):
         required=True,
         copy=False,
         default='New',
-        tracking=True,
         help='Nomor referensi pembayaran (auto-generated)'
     )
     
@@ -35,7 +48,6 @@ class TwhPayment(models.Model):
         string='Invoice',
         required=True,
         ondelete='cascade',
-        tracking=True,
         help='Invoice yang dibayar'
     )
     
@@ -52,7 +64,7 @@ class TwhPayment(models.Model):
         string='Tanggal Bayar',
         required=True,
         default=fields.Date.today,
-        tracking=True,
+        copy=False,
         help='Tanggal pembayaran diterima'
     )
     
@@ -64,16 +76,13 @@ class TwhPayment(models.Model):
         help='Jumlah uang yang dibayarkan'
     )
     
-    payment_method = fields.Selection([
-        ('bank_bca', 'Transfer BCA'),
-        ('bank_mandiri', 'Transfer Mandiri'),
-        ('bank_bni', 'Transfer BNI'),
-        ('bank_bri', 'Transfer BRI'),
-        ('cash', 'Tunai'),
-        ('giro', 'Giro'),
-        ('other', 'Lainnya'),
-    ], string='Metode Pembayaran', required=True, default='bank_bca', tracking=True,
-       help='Cara pembayaran yang digunakan')
+    payment_method = fields.Selection(
+        _PAYMENT_METHODS,
+        string='Metode Pembayaran',
+        required=True,
+        default='bank_bca',
+        help='Cara pembayaran yang digunakan'
+    )
     
     note = fields.Text(
         string='Catatan',
@@ -84,11 +93,13 @@ class TwhPayment(models.Model):
     proof_file = fields.Binary(
         string='Bukti Pembayaran',
         attachment=True,
+        copy=False,
         help='Upload bukti transfer (JPG, PNG, atau PDF)'
     )
     
     proof_filename = fields.Char(
-        string='Nama File'
+        string='Nama File',
+        copy=False
     )
     
     # Informasi Tambahan
@@ -102,6 +113,7 @@ class TwhPayment(models.Model):
         string='Dicatat Oleh',
         default=lambda self: self.env.user,
         readonly=True,
+        copy=False,
         help='User yang mencatat pembayaran ini'
     )
     
@@ -119,39 +131,85 @@ class TwhPayment(models.Model):
     ], string='Status', default='draft', tracking=True,
        help='Status pembayaran')
     
+    # ========================
+    # INIT METHOD (Index)
+    # ========================
+    
+    def init(self):
+        """
+        Buat index komposit untuk query revenue dan status pembayaran.
+        
+        Revenue dihitung dari payment confirmed dalam range tanggal,
+        jadi index (payment_date, state) dipakai untuk range scan.
+        
+        Status pembayaran invoice dijumlahkan per (invoice_id, state);
+        index (invoice_id, state, amount) bisa dipakai untuk index-only
+        scan, sekaligus untuk baca payment_ids per invoice.
+        """
+        tools.create_index(
+            self.env.cr, 'twh_payment_date_state_idx',
+            self._table, ['payment_date', 'state']
+        )
+        tools.create_index(
+            self.env.cr, 'twh_payment_invoice_state_amount_idx',
+            self._table, ['invoice_id', 'state', 'amount']
+        )
+    
     # ========================
     # CRUD METHODS
     # ========================
     
-    @api.model
-    def create(self, vals):
+    @api.model_create_multi
+    def create(self, vals_list):
         """
         Override create untuk:
         1. Generate nomor referensi otomatis
         2. Auto-confirm pembayaran setelah dibuat
+        3. Update status invoice untuk pembayaran yang dibuat langsung
+           confirmed (tidak lewat action_confirm)
+        
+        Mendukung pembuatan banyak pembayaran sekaligus (satu INSERT).
         """
         # Generate nomor referensi
-        if vals.get('name', 'New') == 'New':
-            vals['name'] = self.env['ir.sequence'].next_by_code('twh.payment') or 'New'
+        sequence_model = self.env['ir.sequence']
+        for vals in vals_list:
+            if vals.get('name', 'New') == 'New':
+                vals['name'] = sequence_model.next_by_code('twh.payment') or 'New'
         
         # Buat record payment
-        payment = super(TwhPayment, self).create(vals)
+        payments = super(TwhPayment, self).create(vals_list)
+        
+        # Payment yang dibuat langsung non-draft (misal import dengan
+        # state 'confirmed') tidak lewat action_confirm
+        non_drafts = payments.filtered(lambda payment: payment.state != 'draft')
         
-        # Langsung konfirmasi payment
-        payment.action_confirm()
+        # Langsung konfirmasi payment draft (status invoice ikut di-update)
+        payments.action_confirm()
         
-        return payment
+        # Update status invoice untuk payment non-draft di atas
+        if non_drafts:
+            non_drafts.invoice_id._update_state_from_payments()
+        
+        return payments
     
     def write(self, vals):
         """
         Override write untuk update status invoice saat payment berubah.
+        
+        Hanya invoice dari payment yang amount/state-nya benar-benar
+        berubah yang di-update (write dengan nilai sama di-skip).
         """
+        # Catat payment yang amount/state-nya berubah (sebelum write)
+        changed_fields = [name for name in ('amount', 'state') if name in vals]
+        changed = self.filtered(
+            lambda payment: any(payment[name] != vals[name] for name in changed_fields)
+        ) if changed_fields else self.browse()
+        
         result = super(TwhPayment, self).write(vals)
         
-        # Jika amount atau state berubah, recalculate invoice payment status
-        if 'amount' in vals or 'state' in vals:
-            for payment in self:
-                payment.invoice_id._compute_payment_status()
+        # Update status invoice yang terdampak
+        if changed:
+            changed.invoice_id._update_state_from_payments()
         
         return result
     
@@ -166,8 +224,7 @@ class TwhPayment(models.Model):
         result = super(TwhPayment, self).unlink()
         
         # Update status invoice
-        for invoice in invoices:
-            invoice._compute_payment_status()
+        invoices.exists()._update_state_from_payments()
         
         return result
     
@@ -184,36 +241,47 @@ class TwhPayment(models.Model):
         2. Status invoice di-update otomatis
         3. Notifikasi dikirim ke invoice
         """
-        for payment in self:
-            # Skip jika sudah confirmed
-            if payment.state != 'draft':
-                continue
-            
-            # Validasi 1: Jumlah harus lebih dari 0
-            if payment.amount <= 0:
-                raise ValidationError(_('Jumlah pembayaran harus lebih dari 0!'))
-            
-            # Validasi 2: Tidak boleh melebihi sisa tagihan
-            if payment.amount > payment.invoice_id.remaining_amount:
+        # Skip yang sudah confirmed/cancelled
+        drafts = self.filtered(lambda payment: payment.state == 'draft')
+        
+        # Validasi 1: Jumlah harus lebih dari 0
+        if any(payment.amount <= 0 for payment in drafts):
+            raise ValidationError(_('Jumlah pembayaran harus lebih dari 0!'))
+        
+        # Validasi 2: Tidak boleh melebihi sisa tagihan
+        # (beberapa payment ke invoice yang sama mengurangi sisa bersama)
+        # Sisa tagihan semua invoice dihitung/dibaca sekaligus di awal
+        remaining_map = {
+            invoice.id: invoice.remaining_amount
+            for invoice in drafts.invoice_id
+        }
+        drawn = defaultdict(float)
+        for payment in drafts:
+            invoice = payment.invoice_id
+            remaining = remaining_map[invoice.id] - drawn[invoice.id]
+            if payment.amount > remaining:
                 raise ValidationError(
                     _('Jumlah pembayaran (%(paid)s) tidak boleh melebihi sisa tagihan (%(remaining)s)!') % {
                         'paid': payment.amount,
-                        'remaining': payment.invoice_id.remaining_amount
+                        'remaining': remaining
                     }
                 )
-            
-            # Update status payment
-            payment.write({'state': 'confirmed'})
-            
-            # Update status invoice (via computed field)
-            payment.invoice_id._compute_payment_status()
-            
-            # Kirim notifikasi ke invoice
-            payment.invoice_id.message_post(
-                body=_('Pembayaran diterima: %s via %s') % (
-                    payment.amount,
-                    dict(payment._fields['payment_method'].selection).get(payment.payment_method)
-                )
+            drawn[invoice.id] += payment.amount
+        
+        # Update status semua payment sekaligus
+        # (status invoice ikut di-update di write)
+        drafts.write({'state': 'confirmed'})
+        
+        # Kirim notifikasi ke invoice (satu pesan per invoice)
+        received = defaultdict(list)
+        for payment in drafts:
+            received[payment.invoice_id].append('%s via %s' % (
+                payment.amount,
+                _PAYMENT_METHOD_LABELS.get(payment.payment_method)
+            ))
+        for invoice, entries in received.items():
+            invoice.message_post(
+                body=_('Pembayaran diterima: %s') % ', '.join(entries)
             )
     
     def action_cancel(self):
@@ -225,25 +293,23 @@ class TwhPayment(models.Model):
         2. Status invoice di-update (kembalikan sisa tagihan)
         3. Notifikasi dikirim ke invoice
         """
+        # Update status sekaligus (status invoice ikut di-update di write)
+        self.write({'state': 'cancelled'})
+        
+        # Kirim notifikasi (satu pesan per invoice)
+        cancelled = defaultdict(list)
         for payment in self:
-            # Update status
-            payment.write({'state': 'cancelled'})
-            
-            # Update status invoice
-            payment.invoice_id._compute_payment_status()
-            
-            # Kirim notifikasi
-            payment.invoice_id.message_post(
-                body=_('Pembayaran dibatalkan: %s') % payment.name
+            cancelled[payment.invoice_id].append(payment.name)
+        for invoice, names in cancelled.items():
+            invoice.message_post(
+                body=_('Pembayaran dibatalkan: %s') % ', '.join(names)
             )
     
     # ========================
     # CONSTRAINTS
     # ========================
     
-    @api.constrains('amount')
-    def _check_amount(self):
-        """Validasi jumlah pembayaran harus lebih dari 0."""
-        for payment in self:
-            if payment.amount <= 0:
-                raise ValidationError(_('Jumlah pembayaran harus lebih dari 0!'))
\ No newline at end of file
+    _sql_constraints = [
+        ('amount_positive', 'CHECK(amount > 0)',
+         'Jumlah pembayaran harus lebih dari 0!')
+    ]
\ No newline at end of file
@@ -1,11 +1,87 @@
 # -*- coding: utf-8 -*-
 
-from odoo import api, fields, models, _
-from odoo.exceptions import ValidationError
+from collections import defaultdict
+
+from odoo import api, fields, models, tools
 import logging
 
 _logger = logging.getLogger(__name__)
 
+# Field harga tier yang disimpan di product.product & product.template
+_TWH_PRICE_FIELDS = ('price_bayu', 'price_dealer', 'price_a', 'price_b', 'price_het')
+
+
+def _create_price_columns(model):
+    """
+    Buat kolom harga tier langsung via SQL jika belum ada.
+    
+    Dipanggil dari _auto_init sebelum ORM membuat kolom. Kalau kolom
+    sudah ada, ORM tidak menjadwalkan recompute untuk semua produk.
+    Saat kolom dibuat belum ada harga tier, jadi semua harga memang 0;
+    kolom dibiarkan NULL (dibaca ORM sebagai 0.0), tanpa UPDATE yang
+    menulis ulang semua baris produk.
+    
+    Args:
+        model: Model product.product atau product.template
+    """
+    cr = model.env.cr
+    missing = [
+        name for name in _TWH_PRICE_FIELDS
+        if not tools.column_exists(cr, model._table, name)
+    ]
+    if not missing:
+        return
+    
+    for name in missing:
+        tools.create_column(cr, model._table, name, model._fields[name].column_type[1])
+    _logger.info('Kolom harga TWH dibuat di %s: %s', model._table, ', '.join(missing))
+
+
+def _create_first_variant_column(template_model):
+    """
+    Buat & isi kolom twh_first_variant_id langsung via SQL jika belum ada.
+    
+    Variant pertama = variant aktif dengan ID terkecil, sama dengan
+    _compute_twh_first_variant_id. Kalau kolom diisi lewat SQL, ORM tidak
+    menjadwalkan recompute untuk semua template (dan harga template yang
+    bergantung padanya). Harga template sekalian disamakan dengan harga
+    variant pertama, jika kolom harga variant sudah ada.
+    
+    Args:
+        template_model: Model product.template
+    """
+    cr = template_model.env.cr
+    table = template_model._table
+    if tools.column_exists(cr, table, 'twh_first_variant_id'):
+        return
+    
+    tools.create_column(
+        cr, table, 'twh_first_variant_id',
+        template_model._fields['twh_first_variant_id'].column_type[1]
+    )
+    cr.execute("""
+        UPDATE product_template pt
+           SET twh_first_variant_id = pp.first_id
+          FROM (SELECT product_tmpl_id, MIN(id) AS first_id
+                  FROM product_product
+                 WHERE active
+                 GROUP BY product_tmpl_id) pp
+         WHERE pp.product_tmpl_id = pt.id
+    """)
+    
+    price_fields = [
+        name for name in _TWH_PRICE_FIELDS
+        if tools.column_exists(cr, 'product_product', name)
+    ]
+    if price_fields:
+        cr.execute("""
+            UPDATE product_template pt
+               SET {}
+              FROM product_product pp
+             WHERE pp.id = pt.twh_first_variant_id
+        """.format(', '.join('"%s" = pp."%s"' % (name, name) for name in price_fields)))
+    _logger.info('Kolom twh_first_variant_id dibuat di %s', table)
+
 
 class TwhPriceTier(models.Model):
     """
@@ -98,6 +174,8 @@ class TwhProductPrice(models.Model):
         string='Kategori Harga',
         required=True,
         ondelete='cascade',
+        index=True,
+        auto_join=True,
         help='Tier harga yang digunakan'
     )
     
@@ -127,19 +205,31 @@ class TwhProductPrice(models.Model):
     )
     
     # ========================
-    # CONSTRAINTS
+    # INIT METHOD (Index)
     # ========================
     
-    @api.constrains('price')
-    def _check_price(self):
-        """Validasi harga tidak boleh negatif."""
-        for record in self:
-            if record.price < 0:
-                raise ValidationError(_('Harga tidak boleh negatif!'))
+    def init(self):
+        """
+        Buat index komposit untuk query harga per produk & tier.
+        
+        Harga tier dibaca per (product_id, tier_code) oleh compute harga
+        produk dan get_prices_by_tier; index (product_id, tier_code, price)
+        bisa dipakai untuk index scan tanpa join ke twh_price_tier.
+        """
+        tools.create_index(
+            self.env.cr, 'twh_product_price_product_tier_code_idx',
+            self._table, ['product_id', 'tier_code', 'price']
+        )
+    
+    # ========================
+    # CONSTRAINTS
+    # ========================
     
     _sql_constraints = [
         ('product_tier_unique', 'unique(product_id, tier_id)',
-         'Satu produk hanya bisa punya satu harga per tier!')
+         'Satu produk hanya bisa punya satu harga per tier!'),
+        ('price_positive', 'CHECK(price >= 0)',
+         'Harga tidak boleh negatif!')
     ]
 
 
@@ -149,6 +239,15 @@ class ProductProduct(models.Model):
     """
     _inherit = 'product.product'
     
+    # Mapping kode tier -> field harga di produk
+    _TIER_FIELD_MAP = {
+        'bayu': 'price_bayu',
+        'dealer': 'price_dealer',
+        'price_a': 'price_a',
+        'price_b': 'price_b',
+        'het': 'price_het',
+    }
+    
     # ========================
     # FIELDS
     # ========================
@@ -158,6 +257,7 @@ class ProductProduct(models.Model):
         'twh.product.price',
         'product_id',
         string='Harga TWH',
+        auto_join=True,
         help='Daftar harga produk ini per tier'
     )
     
@@ -197,6 +297,15 @@ class ProductProduct(models.Model):
         help='Harga Eceran Tertinggi'
     )
     
+    # ========================
+    # INIT METHOD
+    # ========================
+    
+    def _auto_init(self):
+        """Siapkan kolom harga tier via SQL sebelum ORM (lihat _create_price_columns)."""
+        _create_price_columns(self)
+        return super(ProductProduct, self)._auto_init()
+    
     # ========================
     # COMPUTED METHODS
     # ========================
@@ -208,32 +317,37 @@ class ProductProduct(models.Model):
         
         Field computed ini memudahkan akses harga tanpa perlu
         search twh_price_ids setiap kali.
+        
+        Harga produk yang sudah tersimpan diambil dengan satu query
+        GROUP BY (product_id, tier_code); produk baru (belum ada di
+        database) dihitung dari twh_price_ids di memory.
         """
+        # Harga per tier semua produk tersimpan (satu query)
+        price_map = defaultdict(dict)
+        saved_products = self.filtered('id')
+        if saved_products:
+            rows = self.env['twh.product.price']._read_group(
+                [('product_id', 'in', saved_products.ids)],
+                groupby=['product_id', 'tier_code'],
+                aggregates=['price:max'],
+            )
+            for product, tier_code, price in rows:
+                field_name = self._TIER_FIELD_MAP.get(tier_code)
+                if field_name:
+                    price_map[product.id][field_name] = price
+        
         for product in self:
             # Default semua harga 0
-            prices = {
-                'price_bayu': 0.0,
-                'price_dealer': 0.0,
-                'price_a': 0.0,
-                'price_b': 0.0,
-                'price_het': 0.0,
-            }
+            prices = dict.fromkeys(self._TIER_FIELD_MAP.values(), 0.0)
             
-            # Loop semua harga yang tersimpan
-            for price_line in product.twh_price_ids:
-                tier_code = price_line.tier_code
-                
-                # Map tier_code ke field
-                if tier_code == 'bayu':
-                    prices['price_bayu'] = price_line.price
-                elif tier_code == 'dealer':
-                    prices['price_dealer'] = price_line.price
-                elif tier_code == 'price_a':
-                    prices['price_a'] = price_line.price
-                elif tier_code == 'price_b':
-                    prices['price_b'] = price_line.price
-                elif tier_code == 'het':
-                    prices['price_het'] = price_line.price
+            if product.id:
+                prices.update(price_map[product.id])
+            else:
+                # Produk baru: loop harga yang ada di memory
+                for price_line in product.twh_price_ids:
+                    field_name = self._TIER_FIELD_MAP.get(price_line.tier_code)
+                    if field_name:
+                        prices[field_name] = price_line.price
             
             # Update field produk
             product.update(prices)
@@ -258,12 +372,10 @@ class ProductProduct(models.Model):
         """
         self.ensure_one()
         
-        # Cari harga dengan tier_code yang sesuai
-        price_line = self.twh_price_ids.filtered(
-            lambda line: line.tier_code == tier_code
-        )
+        # Index harga per tier_code, lalu lookup langsung
+        prices = {line.tier_code: line.price for line in self.twh_price_ids}
         
-        return price_line.price if price_line else 0.0
+        return prices.get(tier_code, 0.0)
     
     def get_price_by_tier_id(self, tier_id):
         """
@@ -282,12 +394,39 @@ class ProductProduct(models.Model):
         """
         self.ensure_one()
         
-        # Cari harga dengan tier_id yang sesuai
-        price_line = self.twh_price_ids.filtered(
-            lambda line: line.tier_id.id == tier_id
+        # Index harga per tier_id, lalu lookup langsung
+        prices = {line.tier_id.id: line.price for line in self.twh_price_ids}
+        
+        return prices.get(tier_id, 0.0)
+    
+    def get_prices_by_tier(self, tier_code):
+        """
+        Ambil harga banyak produk sekaligus berdasarkan kode tier.
+        
+        Versi batch dari get_price_by_tier: satu query untuk semua
+        produk di recordset, bukan satu lookup per produk.
+        
+        Args:
+            tier_code (str): Kode tier ('bayu', 'dealer', 'price_a', dll)
+        
+        Returns:
+            dict: {product_id (int): harga (float)}, 0 jika tidak ada harga
+        
+        Contoh:
+            >>> products.get_prices_by_tier('bayu')
+            {12: 100000.0, 15: 0.0}
+        """
+        prices = dict.fromkeys(self.ids, 0.0)
+        
+        price_lines = self.env['twh.product.price'].search_read(
+            [('product_id', 'in', self.ids), ('tier_code', '=', tier_code)],
+            ['product_id', 'price'],
+            load=None
         )
+        for price_line in price_lines:
+            prices[price_line['product_id']] = price_line['price']
         
-        return price_line.price if price_line else 0.0
+        return prices
 
 
 class ProductTemplate(models.Model):
@@ -300,6 +439,15 @@ class ProductTemplate(models.Model):
     # FIELDS
     # ========================
     
+    # Variant pertama (sumber harga template)
+    twh_first_variant_id = fields.Many2one(
+        'product.product',
+        string='Variant Pertama',
+        compute='_compute_twh_first_variant_id',
+        store=True,
+        help='Variant aktif dengan ID terkecil, harganya dipakai sebagai harga template'
+    )
+    
     # Field harga (computed dari variant pertama)
     price_bayu = fields.Float(
         string='Harga Bayu',
@@ -371,17 +519,46 @@ class ProductTemplate(models.Model):
     ], string='Merk Motor',
        help='Merk motor yang kompatibel')
     
+    # ========================
+    # INIT METHOD
+    # ========================
+    
+    def _auto_init(self):
+        """
+        Siapkan kolom harga tier & variant pertama via SQL sebelum ORM.
+        
+        Lihat _create_price_columns dan _create_first_variant_column.
+        """
+        _create_price_columns(self)
+        _create_first_variant_column(self)
+        return super(ProductTemplate, self)._auto_init()
+    
     # ========================
     # COMPUTED METHODS
     # ========================
     
+    @api.depends('product_variant_ids', 'product_variant_ids.active')
+    def _compute_twh_first_variant_id(self):
+        """
+        Simpan variant pertama tiap template (kosong jika belum ada variant).
+        
+        Variant pertama = variant aktif dengan ID terkecil, bukan urutan
+        _order product.product, supaya tidak berubah diam-diam saat kode
+        atau nama variant diedit. Variant yang belum tersimpan ditaruh
+        paling belakang.
+        """
+        for template in self:
+            template.twh_first_variant_id = template.product_variant_ids.sorted(
+                lambda variant: variant._origin.id or float('inf')
+            )[:1]
+    
     @api.depends(
-        'product_variant_ids',
-        'product_variant_ids.price_bayu',
-        'product_variant_ids.price_dealer',
-        'product_variant_ids.price_a',
-        'product_variant_ids.price_b',
-        'product_variant_ids.price_het'
+        'twh_first_variant_id',
+        'twh_first_variant_id.price_bayu',
+        'twh_first_variant_id.price_dealer',
+        'twh_first_variant_id.price_a',
+        'twh_first_variant_id.price_b',
+        'twh_first_variant_id.price_het'
     )
     def _compute_twh_prices_template(self):
         """
@@ -389,11 +566,14 @@ class ProductTemplate(models.Model):
         
         Untuk produk tanpa variant, akan ambil dari variant tunggal yang auto-created.
         Untuk produk dengan variant, ambil harga dari variant pertama.
+        
+        Hanya bergantung ke harga twh_first_variant_id, jadi perubahan harga
+        variant lain tidak memicu recompute template.
         """
         for template in self:
-            if template.product_variant_ids:
+            first_variant = template.twh_first_variant_id
+            if first_variant:
                 # Ambil harga dari variant pertama
-                first_variant = template.product_variant_ids[0]
                 template.price_bayu = first_variant.price_bayu
                 template.price_dealer = first_variant.price_dealer
                 template.price_a = first_variant.price_a
@@ -1,6 +1,6 @@
 /** @odoo-module **/
 
-import { Component, onMounted, useState } from "@odoo/owl";
+import { Component, onMounted, onWillUnmount, useState } from "@odoo/owl";
 import { registry } from "@web/core/registry";
 import { useService } from "@web/core/utils/hooks";
 
@@ -46,10 +46,21 @@ export class TwhDashboard extends Component {
       monthly_sales: [],
     });
 
+    // Instance ApexCharts yang sedang tampil (di-update, bukan dibuat ulang)
+    this.chart = null;
+
     // Load data saat component mounted
     onMounted(() => {
       this.loadDashboardData();
     });
+
+    // Hapus chart saat component ditutup
+    onWillUnmount(() => {
+      if (this.chart) {
+        this.chart.destroy();
+        this.chart = null;
+      }
+    });
   }
 
   /**
@@ -59,18 +70,19 @@ export class TwhDashboard extends Component {
    */
   async loadDashboardData(revenuePeriod = "month") {
     try {
-      // Panggil method backend untuk ambil summary
+      // Grafik penjualan dimuat bertahap, paralel dengan summary
+      const salesLoaded = this.loadSalesData();
+
+      // Panggil method backend untuk ambil summary (tanpa grafik)
       const summary = await this.orm.call(
         "twh.dashboard",
         "get_dashboard_summary",
-        [revenuePeriod]
+        [revenuePeriod, ["counters", "unpaid", "revenue"]]
       );
 
       // Update state dengan data dari backend
       this.updateStateFromSummary(summary);
-
-      // Render chart setelah DOM ready
-      setTimeout(() => this.renderSalesChart(), 100);
+      await salesLoaded;
 
       console.log("Dashboard berhasil dimuat:", {
         revenue: this.state.total_revenue,
@@ -100,7 +112,43 @@ export class TwhDashboard extends Component {
       summary.revenue_period_label || "Bulan Ini";
     this.state.revenue_payment_count = summary.revenue_payment_count || 0;
     this.state.revenue_invoice_count = summary.revenue_invoice_count || 0;
-    this.state.monthly_sales = summary.monthly_sales || [];
+  }
+
+  /**
+   * Load data penjualan bulanan per potongan
+   *
+   * Mulai dari bulan terbaru, lalu mundur dengan potongan yang makin
+   * panjang (lihat get_sales_data_chunk). Grafik di-render ulang tiap
+   * potongan datang, jadi bulan terbaru langsung tampil.
+   *
+   * @param {number} months - Jumlah bulan yang ditampilkan (default: 6)
+   */
+  async loadSalesData(months = 6) {
+    try {
+      const salesData = [];
+      let offset = 0;
+      let length = 1;
+
+      while (offset < months) {
+        const chunk = await this.orm.call(
+          "twh.dashboard",
+          "get_sales_data_chunk",
+          [offset, Math.min(length, months - offset)]
+        );
+
+        // Potongan berikutnya lebih lama, jadi ditaruh di depan
+        salesData.unshift(...chunk.data);
+        this.state.monthly_sales = [...salesData];
+
+        // Render chart setelah DOM ready
+        setTimeout(() => this.renderSalesChart(), 100);
+
+        offset = chunk.next_offset;
+        length = chunk.next_length;
+      }
+    } catch (error) {
+      console.error("Gagal memuat data penjualan:", error);
+    }
   }
 
   /**
@@ -111,7 +159,31 @@ export class TwhDashboard extends Component {
   async onRevenuePeriodChange(event) {
     const newPeriod = event.target.value;
     console.log("Mengubah periode revenue ke:", newPeriod);
-    await this.loadDashboardData(newPeriod);
+    await this.loadRevenueData(newPeriod);
+  }
+
+  /**
+   * Load ulang bagian revenue saja (tanpa hitung ulang panel lain)
+   *
+   * @param {string} revenuePeriod - Periode revenue ('month', 'year', 'all')
+   */
+  async loadRevenueData(revenuePeriod) {
+    try {
+      const summary = await this.orm.call(
+        "twh.dashboard",
+        "get_dashboard_summary",
+        [revenuePeriod, ["revenue"]]
+      );
+
+      this.state.total_revenue = summary.total_revenue || "Rp 0";
+      this.state.revenue_period = summary.revenue_period || "month";
+      this.state.revenue_period_label =
+        summary.revenue_period_label || "Bulan Ini";
+      this.state.revenue_payment_count = summary.revenue_payment_count || 0;
+      this.state.revenue_invoice_count = summary.revenue_invoice_count || 0;
+    } catch (error) {
+      console.error("Gagal memuat data revenue:", error);
+    }
   }
 
   /**
@@ -131,15 +203,22 @@ export class TwhDashboard extends Component {
       return;
     }
 
-    // Clear chart yang sudah ada
-    chartElement.innerHTML = "";
-
     // Konfigurasi chart
     const options = this.getChartOptions();
 
-    // Render chart
-    const chart = new ApexCharts(chartElement, options);
-    chart.render();
+    // Chart sudah ada di element yang sama: cukup update datanya
+    if (this.chart && this.chart.el === chartElement) {
+      this.chart.updateOptions(options);
+      return;
+    }
+
+    // Element baru (atau belum ada chart): buang chart lama, render ulang
+    if (this.chart) {
+      this.chart.destroy();
+    }
+    chartElement.innerHTML = "";
+    this.chart = new ApexCharts(chartElement, options);
+    this.chart.render();
   }
 
   /**